@@ -3,78 +3,271 @@ Gossip算法核心实现
 实现了基于推送和拉取的Gossip协议
 """
 
-import random
-import time
+import math
 import threading
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # 未安装Numba时退化为普通Python函数，结果一致，只是更慢
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+        
+    prange = range
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # 未安装SciPy时用NumPy计算全部节点对的距离
+    cKDTree = None
 
-class NodeState(Enum):
-    """节点状态枚举"""
-    SUSCEPTIBLE = "susceptible"  # 易感染状态
-    INFECTED = "infected"        # 已感染状态
-    REMOVED = "removed"          # 移除状态
+
+class NodeState(IntEnum):
+    """节点状态枚举（取值即状态数组中的编码）"""
+    SUSCEPTIBLE = 0  # 易感染状态
+    INFECTED = 1     # 已感染状态
+    REMOVED = 2      # 移除状态
 
 
 @dataclass
 class Message:
     """消息数据结构"""
-    id: str
+    id: int
     content: str
-    timestamp: float
+    timestamp: int  # 发出消息时的模拟步数
     source_node: int
     hop_count: int = 0
 
 
+# 消息日志记录：每条记录对应一次成功送达
+MESSAGE_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('source', np.int32),
+    ('target', np.int32),
+    ('timestamp', np.int64),  # 模拟步数
+    ('hop_count', np.int32),
+])
+
+
+@njit(cache=True, nogil=True, fastmath=True, parallel=True)
+def _step_kernel(states, neighbor_offsets, neighbor_indices, infection_probs, recovery_probs,
+                 hop_counts, infected_nodes, transmission_probability,
+                 slot_offsets, pick_rolls, transmission_rolls, infection_rolls, recovery_rolls,
+                 target_recovery_rolls, delivery_targets, infecting, next_infected):
+    """执行一轮传播和恢复（就地修改states和hop_counts），返回下一轮感染节点数
+    
+    随机数由调用方预先批量抽取，第row个感染节点的第f个目标使用各rolls数组的[row, f]。
+    各感染节点相互独立地并行处理：第row个节点从邻居中选出
+    slot_offsets[row + 1] - slot_offsets[row]个目标，送达目标写入
+    delivery_targets[slot_offsets[row]:slot_offsets[row + 1]]（未送达的位置写入-1），
+    使目标被感染的送达只在infecting的对应位置标记为1，全部处理完后再按顺序串行写回，
+    被多个节点同时感染的目标取其中最小的跳数，结果与线程调度无关；
+    同时把未恢复的和新感染的节点依次写入next_infected。
+    本轮开始时的第row个感染节点用recovery_rolls[row]做恢复判定；本轮新感染的节点
+    和其他节点一样当轮就做恢复判定，使用首次感染它的送达对应的target_recovery_rolls[row, f]。
+    参数均为数组或标量，内核运行期间释放GIL，界面线程可同时运行。
+    """
+    for row in prange(len(infected_nodes)):
+        slot = slot_offsets[row]
+        num_targets = slot_offsets[row + 1] - slot
+        if num_targets == 0:
+            continue
+            
+        node_id = infected_nodes[row]
+        start = neighbor_offsets[node_id]
+        degree = neighbor_offsets[node_id + 1] - start
+        
+        # Floyd抽样：从邻居中无放回地选出num_targets个位置，直接写入本节点的送达区间，
+        # 查重只需扫描已选出的不超过fanout个位置，不分配任何临时数组
+        for f in range(num_targets):
+            upper = degree - num_targets + f
+            j = min(int(pick_rolls[row, f] * (upper + 1)), upper)  # 防止float32舍入到upper + 1
+            for m in range(slot, slot + f):
+                if delivery_targets[m] == j:
+                    j = upper
+                    break
+            delivery_targets[slot + f] = j
+            
+        # 每个目标收到各自的消息副本；同一条消息只在本轮发给互不相同的目标，不会重复送达
+        for f in range(num_targets):
+            target_id = neighbor_indices[start + delivery_targets[slot + f]]
+            delivery_targets[slot + f] = -1
+            if transmission_rolls[row, f] < transmission_probability:
+                delivery_targets[slot + f] = target_id
+                # 如果是易感染状态，有概率被感染
+                if (states[target_id] == NodeState.SUSCEPTIBLE and
+                        infection_rolls[row, f] < infection_probs[target_id]):
+                    infecting[slot + f] = 1
+                    
+    # 恢复检查，只遍历感染节点，未恢复的留在下一轮的感染列表中
+    count = 0
+    for row in range(len(infected_nodes)):
+        node_id = infected_nodes[row]
+        if recovery_rolls[row] < recovery_probs[node_id]:
+            states[node_id] = NodeState.REMOVED
+        else:
+            next_infected[count] = node_id
+            count += 1
+            
+    # 写回新感染，只遍历本轮送达的目标；新感染节点的跳数是发送方跳数加一，
+    # 同一节点被多次感染时只处理一次，跳数取最小值；当轮未恢复的加入下一轮的感染列表
+    for row in range(len(infected_nodes)):
+        slot = slot_offsets[row]
+        hop_count = hop_counts[infected_nodes[row]] + 1
+        for m in range(slot, slot_offsets[row + 1]):
+            if infecting[m]:
+                target_id = delivery_targets[m]
+                if states[target_id] == NodeState.SUSCEPTIBLE:
+                    hop_counts[target_id] = hop_count
+                    if target_recovery_rolls[row, m - slot] < recovery_probs[target_id]:
+                        states[target_id] = NodeState.REMOVED
+                    else:
+                        states[target_id] = NodeState.INFECTED
+                        next_infected[count] = target_id
+                        count += 1
+                elif hop_count < hop_counts[target_id]:
+                    hop_counts[target_id] = hop_count
+                    
+    return count
+
+
+@njit(cache=True)
+def _find_root(parent, node_id):
+    """并查集查找（迭代实现，带路径压缩）"""
+    root = node_id
+    while parent[root] != root:
+        root = parent[root]
+    while parent[node_id] != root:
+        next_id = parent[node_id]
+        parent[node_id] = root
+        node_id = next_id
+    return root
+
+
+@njit(cache=True)
+def _connected_components(num_nodes, edge_src, edge_dst):
+    """用并查集（按秩合并）求连通分量，返回每个节点所在分量的根节点编号"""
+    parent = np.arange(num_nodes).astype(np.int32)
+    rank = np.zeros(num_nodes, dtype=np.int32)
+    for e in range(len(edge_src)):
+        a = _find_root(parent, edge_src[e])
+        b = _find_root(parent, edge_dst[e])
+        if a == b:
+            continue
+        if rank[a] < rank[b]:
+            a, b = b, a
+        parent[b] = a
+        if rank[a] == rank[b]:
+            rank[a] += 1
+            
+    roots = np.empty(num_nodes, dtype=np.int32)
+    for node_id in range(num_nodes):
+        roots[node_id] = _find_root(parent, node_id)
+    return roots
+
+
+def default_fanout(num_nodes: int) -> int:
+    """按网络规模取默认传播扇出：max(3, ceil(log2(N)))
+    
+    扇出取O(log N)时推送式Gossip能以高概率覆盖全网，同时避免大网络中的冗余传输。
+    Solana固定使用CRDS_GOSSIP_PUSH_FANOUT=9，相当于这里N≈512时的取值。
+    """
+    return max(3, math.ceil(math.log2(max(num_nodes, 1))))
+
+
 class GossipNode:
-    """Gossip协议节点"""
+    """Gossip协议节点
+    
+    节点数据以数组形式（SoA）保存在GossipSimulator上，
+    这里只是按节点编号访问这些数组的轻量视图，便于可视化等代码按节点读取。
+    """
     
-    def __init__(self, node_id: int, x: float, y: float):
+    def __init__(self, simulator: "GossipSimulator", node_id: int):
+        self.simulator = simulator
         self.node_id = node_id
-        self.x = x
-        self.y = y
-        self.state = NodeState.SUSCEPTIBLE
-        self.messages: Dict[str, Message] = {}
-        self.neighbors: Set[int] = set()
-        self.infection_probability = 0.1
-        self.recovery_probability = 0.05
-        self.is_active = True
-        self.message_history: List[Message] = []
-        
-    def add_neighbor(self, neighbor_id: int):
-        """添加邻居节点"""
-        self.neighbors.add(neighbor_id)
-        
-    def remove_neighbor(self, neighbor_id: int):
-        """移除邻居节点"""
-        self.neighbors.discard(neighbor_id)
         
+    @property
+    def x(self) -> float:
+        return float(self.simulator.xs[self.node_id])
+        
+    @property
+    def y(self) -> float:
+        return float(self.simulator.ys[self.node_id])
+        
+    @property
+    def state(self) -> NodeState:
+        return NodeState(self.simulator.states[self.node_id])
+        
+    @state.setter
+    def state(self, value: NodeState):
+        self.simulator.states[self.node_id] = value
+        self.simulator._infected_nodes = None
+        
+    @property
+    def neighbors(self) -> np.ndarray:
+        """邻居节点编号（CSR邻接表中的连续切片）"""
+        sim = self.simulator
+        start = sim.neighbor_offsets[self.node_id]
+        end = sim.neighbor_offsets[self.node_id + 1]
+        return sim.neighbor_indices[start:end]
+        
+    @property
+    def infection_probability(self) -> float:
+        return float(self.simulator.infection_probs[self.node_id])
+        
+    @infection_probability.setter
+    def infection_probability(self, value: float):
+        self.simulator.infection_probs[self.node_id] = value
+        
+    @property
+    def recovery_probability(self) -> float:
+        return float(self.simulator.recovery_probs[self.node_id])
+        
+    @recovery_probability.setter
+    def recovery_probability(self, value: float):
+        self.simulator.recovery_probs[self.node_id] = value
+        
+    @property
+    def message_count(self) -> int:
+        """累计接收的消息数"""
+        return int(self.simulator.msg_counts[self.node_id])
+        
+    @property
+    def messages(self) -> Dict[int, Message]:
+        return {message.id: message for message in self.message_history}
+        
+    @property
+    def message_history(self) -> List[Message]:
+        """按接收顺序排列的已接收消息（仅限消息日志中保留的最近记录）"""
+        log = self.simulator.message_log
+        return [
+            Message(
+                id=int(record['id']),
+                content=f"Gossip from node {record['source']}",
+                timestamp=int(record['timestamp']),
+                source_node=int(record['source']),
+                hop_count=int(record['hop_count'])
+            )
+            for record in log[log['target'] == self.node_id]
+        ]
+    
     def infect(self):
         """感染节点"""
         if self.state == NodeState.SUSCEPTIBLE:
             self.state = NodeState.INFECTED
-            
-    def recover(self):
-        """节点恢复"""
-        if self.state == NodeState.INFECTED and random.random() < self.recovery_probability:
-            self.state = NodeState.REMOVED
-            
-    def receive_message(self, message: Message):
-        """接收消息"""
-        if message.id not in self.messages:
-            self.messages[message.id] = message
-            self.message_history.append(message)
-            # 如果是易感染状态，有概率被感染
-            if self.state == NodeState.SUSCEPTIBLE and random.random() < self.infection_probability:
-                self.infect()
 
 
 class GossipSimulator:
     """Gossip算法模拟器"""
     
-    def __init__(self, num_nodes: int = 50, width: int = 800, height: int = 600):
+    def __init__(self, num_nodes: int = 50, width: int = 800, height: int = 600,
+                 seed: Optional[int] = None, message_log_capacity: int = 10000,
+                 gossip_fanout: Optional[int] = None):
         self.num_nodes = num_nodes
         self.width = width
         self.height = height
@@ -82,83 +275,116 @@ class GossipSimulator:
         self.running = False
         self.step_count = 0
         self.message_counter = 0
+        self.rng = np.random.default_rng(seed)  # 所有随机数都由该生成器批量产生
+        
+        # 节点数据（SoA）：每个属性一个连续数组，按节点编号索引。
+        # states在模拟器外部只读，修改节点状态请通过GossipNode.state、start_gossip
+        # 或update_parameters，否则增量维护的感染节点索引不会随之更新
+        self.states = np.full(num_nodes, NodeState.SUSCEPTIBLE, dtype=np.uint8)
+        self.xs = np.zeros(num_nodes, dtype=np.float32)
+        self.ys = np.zeros(num_nodes, dtype=np.float32)
+        self.infection_probs = np.full(num_nodes, 0.1, dtype=np.float32)
+        self.recovery_probs = np.full(num_nodes, 0.05, dtype=np.float32)
+        
+        # CSR邻接表：节点i的邻居为 neighbor_indices[neighbor_offsets[i]:neighbor_offsets[i+1]]
+        self.neighbor_offsets = np.zeros(num_nodes + 1, dtype=np.int32)
+        self.neighbor_indices = np.zeros(0, dtype=np.int32)
+        # 无向边列表，形状为(E, 2)，每条边只出现一次且两端满足 i < j
+        self.edges = np.zeros((0, 2), dtype=np.int32)
+        
+        # 每个节点被感染时消息已经过的跳数（初始感染节点为0）
+        self.hop_counts = np.zeros(num_nodes, dtype=np.int32)
+        # 当前感染节点的编号，由内核逐轮增量维护；states被外部修改时置为None，下一轮重新扫描
+        self._infected_nodes: Optional[np.ndarray] = None
+        # 每个节点累计接收的消息数
+        self.msg_counts = np.zeros(num_nodes, dtype=np.int64)
+        
+        # 消息日志：固定容量的环形缓冲区，只保留最近的送达记录
+        self._message_log = np.empty(message_log_capacity, dtype=MESSAGE_DTYPE)
+        self._message_total = 0  # 累计送达次数，决定环形缓冲区的写入位置
         
         # 可调参数
-        self.gossip_fanout = 3  # 每轮传播的邻居数量
+        # 每轮传播的邻居数量，未指定时随网络规模取对数扇出
+        self.gossip_fanout = gossip_fanout if gossip_fanout is not None else default_fanout(num_nodes)
         self.transmission_probability = 0.8  # 传输成功概率
-        self.max_hop_count = 10  # 最大跳数
+        self.max_hop_count: Optional[int] = None  # 最大跳数，None表示不限制
         self.simulation_speed = 1.0  # 模拟速度
         
+        # 随机几何图的连接半径；距离判定只比较平方，避免开方
+        self.connection_radius = min(width, height) * 0.15
+        self._connection_radius_sq = self.connection_radius * self.connection_radius
+        
         self._initialize_nodes()
         self._build_network_topology()
         
     def _initialize_nodes(self):
         """初始化节点"""
+        self.xs[:] = self.rng.uniform(50, self.width - 50, self.num_nodes)
+        self.ys[:] = self.rng.uniform(50, self.height - 50, self.num_nodes)
         for i in range(self.num_nodes):
-            x = random.uniform(50, self.width - 50)
-            y = random.uniform(50, self.height - 50)
-            self.nodes[i] = GossipNode(i, x, y)
+            self.nodes[i] = GossipNode(self, i)
             
     def _build_network_topology(self):
         """构建网络拓扑"""
         # 创建随机几何图
-        connection_radius = min(self.width, self.height) * 0.15
+        xs = self.xs.astype(np.float64)
+        ys = self.ys.astype(np.float64)
+        if cKDTree is not None:
+            # KD树只检查半径内的候选点对，O(N log N + E)
+            pairs = cKDTree(np.column_stack((xs, ys))).query_pairs(
+                r=self.connection_radius, output_type='ndarray'
+            )
+            # 按(i, j)排序，使边的顺序与NumPy路径一致
+            pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+            i_arr, j_arr = pairs[:, 0], pairs[:, 1]
+        else:
+            # 用广播一次性计算所有节点对的距离平方，避免逐对的Python循环；
+            # 原地平方、求和，只分配两个N×N的临时数组
+            d2 = xs[:, None] - xs[None, :]
+            d2 *= d2
+            dy = ys[:, None] - ys[None, :]
+            dy *= dy
+            d2 += dy
+            
+            # 只取上三角（i < j），每条边只处理一次
+            mask = (d2 <= self._connection_radius_sq) & np.triu(np.ones_like(d2, dtype=bool), k=1)
+            i_arr, j_arr = np.nonzero(mask)
         
-        for i in range(self.num_nodes):
-            for j in range(i + 1, self.num_nodes):
-                node1 = self.nodes[i]
-                node2 = self.nodes[j]
-                
-                # 计算欧几里得距离
-                distance = ((node1.x - node2.x) ** 2 + (node1.y - node2.y) ** 2) ** 0.5
-                
-                if distance <= connection_radius:
-                    node1.add_neighbor(j)
-                    node2.add_neighbor(i)
-                    
         # 确保网络连通性
-        self._ensure_connectivity()
-        
-    def _ensure_connectivity(self):
-        """确保网络连通性"""
-        # 简单的连通性检查和修复
-        visited = set()
-        
-        def dfs(node_id):
-            if node_id in visited:
-                return
-            visited.add(node_id)
-            for neighbor in self.nodes[node_id].neighbors:
-                dfs(neighbor)
-                
-        if self.nodes:
-            dfs(0)
-            
-        # 如果有未访问的节点，随机连接到已访问的节点
-        unvisited = set(range(self.num_nodes)) - visited
-        for node_id in unvisited:
-            if visited:
-                target = random.choice(list(visited))
-                self.nodes[node_id].add_neighbor(target)
-                self.nodes[target].add_neighbor(node_id)
-                visited.add(node_id)
-                
+        roots = _connected_components(self.num_nodes, i_arr, j_arr)
+        bridge_i, bridge_j = self._ensure_connectivity(roots)
+        i_arr = np.concatenate((i_arr, bridge_i)).astype(np.int32)
+        j_arr = np.concatenate((j_arr, bridge_j)).astype(np.int32)
+        order = np.lexsort((j_arr, i_arr))
+        self.edges = np.column_stack((i_arr[order], j_arr[order]))
+        
+        # 由边列表直接构建CSR邻接表：每条边正反各一次，按(起点, 终点)排序
+        sources = np.concatenate((i_arr, j_arr))
+        targets = np.concatenate((j_arr, i_arr))
+        order = np.lexsort((targets, sources))
+        self.neighbor_indices = targets[order]
+        self.neighbor_offsets = np.zeros(self.num_nodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=self.num_nodes), out=self.neighbor_offsets[1:])
+        
+    def _ensure_connectivity(self, roots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """确保网络连通性，返回需要补充的边(i, j)"""
+        # 把各连通分量的根节点依次相连，串起整个网络
+        components = np.unique(roots)
+        return components[:-1], components[1:]
+        
     def start_gossip(self, initial_infected: List[int] = None):
         """开始Gossip传播"""
         if initial_infected is None:
             initial_infected = [0]  # 默认从节点0开始
             
         # 重置所有节点状态
-        for node in self.nodes.values():
-            node.state = NodeState.SUSCEPTIBLE
-            node.messages.clear()
-            node.message_history.clear()
-            
-        # 感染初始节点
-        for node_id in initial_infected:
-            if node_id in self.nodes:
-                self.nodes[node_id].infect()
-                
+        self._clear_node_states()
+        
+        # 感染初始节点，忽略超出范围的编号
+        initial_infected = np.asarray(initial_infected, dtype=np.int64)
+        valid = (initial_infected >= 0) & (initial_infected < self.num_nodes)
+        self.states[initial_infected[valid]] = NodeState.INFECTED
+        
         self.step_count = 0
         self.running = True
         
@@ -169,94 +395,140 @@ class GossipSimulator:
             
         self.step_count += 1
         
-        # 获取所有感染节点
-        infected_nodes = [node for node in self.nodes.values() 
-                         if node.state == NodeState.INFECTED]
+        # 获取所有感染节点，只在索引失效后才重新扫描states
+        if self._infected_nodes is None:
+            self._infected_nodes = np.flatnonzero(self.states == NodeState.INFECTED).astype(np.int32)
+        infected_nodes = self._infected_nodes
         
-        if not infected_nodes:
+        if len(infected_nodes) == 0:
             self.running = False
             return
             
-        # 每个感染节点尝试传播
-        for node in infected_nodes:
-            self._gossip_step(node)
-            
-        # 节点恢复检查
-        for node in self.nodes.values():
-            node.recover()
-            
-    def _gossip_step(self, node: GossipNode):
-        """单个节点的Gossip步骤"""
-        if not node.neighbors:
-            return
-            
-        # 选择要传播的邻居
-        available_neighbors = list(node.neighbors)
-        num_targets = min(self.gossip_fanout, len(available_neighbors))
-        targets = random.sample(available_neighbors, num_targets)
-        
-        # 创建消息
-        message = Message(
-            id=f"msg_{self.message_counter}_{node.node_id}",
-            content=f"Gossip from node {node.node_id}",
-            timestamp=time.time(),
-            source_node=node.node_id,
-            hop_count=0
-        )
-        self.message_counter += 1
-        
-        # 向选中的邻居传播
-        for target_id in targets:
-            if (target_id in self.nodes and 
-                random.random() < self.transmission_probability and
-                message.hop_count < self.max_hop_count):
-                
-                target_node = self.nodes[target_id]
-                message.hop_count += 1
-                target_node.receive_message(message)
-                
-    def get_statistics(self) -> Dict:
-        """获取模拟统计信息"""
-        susceptible = sum(1 for node in self.nodes.values() 
-                         if node.state == NodeState.SUSCEPTIBLE)
-        infected = sum(1 for node in self.nodes.values() 
-                      if node.state == NodeState.INFECTED)
-        removed = sum(1 for node in self.nodes.values() 
-                     if node.state == NodeState.REMOVED)
+        # 一次性抽取本轮所需的全部随机数：每个感染节点的每个目标各一次选点、传输判定、感染判定
+        # 和被感染后的恢复判定，每个感染节点自身再各一次恢复判定
+        num_infected = len(infected_nodes)
+        fanout = self.gossip_fanout
+        # 随机数与概率统一用float32，内核中的比较不再混入float64
+        pick_rolls = self.rng.random((num_infected, fanout), dtype=np.float32)
+        transmission_rolls = self.rng.random((num_infected, fanout), dtype=np.float32)
+        infection_rolls = self.rng.random((num_infected, fanout), dtype=np.float32)
+        recovery_rolls = self.rng.random(num_infected, dtype=np.float32)
+        target_recovery_rolls = self.rng.random((num_infected, fanout), dtype=np.float32)
         
-        total_messages = sum(len(node.messages) for node in self.nodes.values())
+        # 为每个感染节点预留连续的送达记录区间，供并行内核各自写入；
+        # 跳数已达上限的节点不再转发
+        degrees = self.neighbor_offsets[infected_nodes + 1] - self.neighbor_offsets[infected_nodes]
+        num_targets = np.minimum(degrees, fanout)
+        if self.max_hop_count is not None:
+            num_targets[self.hop_counts[infected_nodes] >= self.max_hop_count] = 0
         
+        # 每个有转发目标的感染节点本轮发出一条消息
+        sends = num_targets > 0
+        message_ids = self.message_counter + np.cumsum(sends) - 1
+        self.message_counter += int(sends.sum())
+        
+        slot_offsets = np.zeros(num_infected + 1, dtype=np.int64)
+        np.cumsum(num_targets, out=slot_offsets[1:])
+        delivery_targets = np.empty(slot_offsets[-1], dtype=np.int32)
+        infecting = np.zeros(len(delivery_targets), dtype=np.uint8)
+        next_infected = np.empty(num_infected + len(delivery_targets), dtype=np.int32)
+        
+        num_next = _step_kernel(self.states, self.neighbor_offsets, self.neighbor_indices,
+                                self.infection_probs, self.recovery_probs,
+                                self.hop_counts, infected_nodes,
+                                np.float32(self.transmission_probability),
+                                slot_offsets, pick_rolls, transmission_rolls,
+                                infection_rolls, recovery_rolls, target_recovery_rolls,
+                                delivery_targets, infecting, next_infected)
+        self._infected_nodes = next_infected[:num_next]
+        
+        self._record_messages(infected_nodes, message_ids, num_targets, delivery_targets)
+        
+    def _record_messages(self, infected_nodes: np.ndarray, message_ids: np.ndarray,
+                         num_targets: np.ndarray, delivery_targets: np.ndarray):
+        """把本轮送达的消息写入消息日志"""
+        delivered = delivery_targets >= 0
+        rows = np.repeat(np.arange(len(infected_nodes)), num_targets)[delivered]
+        
+        records = np.empty(len(rows), dtype=MESSAGE_DTYPE)
+        records['id'] = message_ids[rows]
+        records['source'] = infected_nodes[rows]
+        records['target'] = delivery_targets[delivered]
+        records['timestamp'] = self.step_count
+        records['hop_count'] = self.hop_counts[records['source']] + 1
+        
+        np.add.at(self.msg_counts, records['target'], 1)
+        
+        # 写入环形缓冲区，超出容量时覆盖最旧的记录
+        capacity = len(self._message_log)
+        if capacity > 0:
+            kept = records[-capacity:]
+            start = self._message_total + len(records) - len(kept)
+            self._message_log[(start + np.arange(len(kept))) % capacity] = kept
+        self._message_total += len(records)
+        
+    @property
+    def message_log(self) -> np.ndarray:
+        """最近的送达记录（MESSAGE_DTYPE结构化数组），按时间先后排列"""
+        capacity = len(self._message_log)
+        if capacity == 0:
+            return self._message_log[:0]
+        if self._message_total <= capacity:
+            return self._message_log[:self._message_total]
+        split = self._message_total % capacity
+        return np.concatenate((self._message_log[split:], self._message_log[:split]))
+        
+    def get_statistics(self) -> Dict:
+        """获取模拟统计信息"""
+        # 一次bincount统计全部状态，states可能被直接修改，不做缓存
+        counts = np.bincount(self.states, minlength=len(NodeState))
         return {
             'step': self.step_count,
-            'susceptible': susceptible,
-            'infected': infected,
-            'removed': removed,
-            'total_messages': total_messages,
+            'susceptible': int(counts[NodeState.SUSCEPTIBLE]),
+            'infected': int(counts[NodeState.INFECTED]),
+            'removed': int(counts[NodeState.REMOVED]),
+            'total_messages': int(self.msg_counts.sum()),
             'running': self.running
         }
-        
+    
     def update_parameters(self, **kwargs):
         """更新模拟参数"""
         for key, value in kwargs.items():
             if hasattr(self, key):
                 setattr(self, key, value)
                 
+        if 'states' in kwargs:
+            self._infected_nodes = None
+            
         # 更新节点参数
         if 'infection_probability' in kwargs:
-            for node in self.nodes.values():
-                node.infection_probability = kwargs['infection_probability']
-                
+            self.infection_probs.fill(kwargs['infection_probability'])
+            
         if 'recovery_probability' in kwargs:
-            for node in self.nodes.values():
-                node.recovery_probability = kwargs['recovery_probability']
-                
+            self.recovery_probs.fill(kwargs['recovery_probability'])
+            
     def reset_simulation(self):
         """重置模拟"""
         self.running = False
         self.step_count = 0
         self.message_counter = 0
+        self._clear_node_states()
         
-        for node in self.nodes.values():
-            node.state = NodeState.SUSCEPTIBLE
-            node.messages.clear()
-            node.message_history.clear()
\ No newline at end of file
+    def _clear_node_states(self):
+        """把所有节点恢复为易感染状态，并清空消息记录"""
+        self.states.fill(NodeState.SUSCEPTIBLE)
+        self.hop_counts.fill(0)
+        self.msg_counts.fill(0)
+        self._message_total = 0
+        self._infected_nodes = None
+
+
+def warm_up():
+    """在当前线程上预先运行一次模拟内核
+    
+    首次运行时完成JIT编译并初始化Numba的并行线程池。需要在其他线程中运行模拟时，
+    应先在主线程调用本函数：TBB线程层若在非主线程中初始化，进程退出时会卡住。
+    """
+    simulator = GossipSimulator(num_nodes=2, seed=0)
+    simulator.start_gossip()
+    simulator.step()
@@ -7,9 +7,18 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import math
-from typing import Dict, List, Tuple
-from gossip_algorithm import GossipSimulator, NodeState
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageTk
+except ImportError:  # 未安装Pillow时逐个创建文本标签
+    Image = None
+
+from gossip_algorithm import GossipSimulator, NodeState, warm_up
 
 
 class GossipVisualization:
@@ -25,16 +34,43 @@ class GossipVisualization:
         
         # 可视化参数
         self.node_radius = 8
+        self.max_labeled_nodes = 50  # 节点数超过该值时不绘制节点标签
         self.colors = {
             NodeState.SUSCEPTIBLE: "#4CAF50",  # 绿色
             NodeState.INFECTED: "#F44336",     # 红色
             NodeState.REMOVED: "#9E9E9E"       # 灰色
         }
+        # 按状态编码索引的颜色查找表
+        self._colors_arr = np.array([self.colors[state] for state in NodeState])
+        
+        # 画布上各节点圆形的item id，以及上次绘制时的节点状态（只重绘状态变化的节点）
+        self._node_items: List[int] = []
+        self._prev_states = np.zeros(0, dtype=np.uint8)
+        # 全部节点标签预先渲染成的一张透明图片（需要保留引用，否则会被回收）
+        self._label_image = None
+        # 各统计标签当前显示的文本
+        self._label_texts: Dict[ttk.Label, str] = {}
+        
+        # 用户是否手动调节过传播扇出（否则随节点数量自动取值）
+        self._fanout_overridden = False
+        # 节点数量滑块停止拖动后才重建网络，记录尚未执行的重建任务
+        self._pending_rebuild: Optional[str] = None
         
         # 动画控制
         self.is_running = False
         self.animation_speed = 100  # 毫秒
         
+        # 模拟线程：在后台按动画速度推进模拟，界面线程只读取其发布的状态快照
+        self._sim_active = threading.Event()  # 置位时模拟线程持续推进
+        self._sim_lock = threading.Lock()     # 保护对模拟器的修改（推进、重置、替换）
+        # 双缓冲：模拟线程写入后台缓冲区后切换_front，界面线程无锁读取前台缓冲区
+        self._state_buffers = [self.simulator.states.copy(), self.simulator.states.copy()]
+        self._stats_buffers = [self.simulator.get_statistics(), self.simulator.get_statistics()]
+        self._front = 0
+        # 单步执行也放到工作线程中，界面线程只轮询结果
+        self._step_executor = ThreadPoolExecutor(max_workers=1)
+        self._step_future: Optional[Future] = None
+        
         # GUI组件
         self.canvas = None
         self.control_frame = None
@@ -43,6 +79,10 @@ class GossipVisualization:
         self._setup_gui()
         self._draw_initial_network()
         
+        warm_up()  # 在主线程上完成JIT编译后再启动模拟线程
+        self._sim_thread = threading.Thread(target=self._run_sim, daemon=True)
+        self._sim_thread.start()
+        
     def _setup_gui(self):
         """设置GUI界面"""
         # 主框架
@@ -113,11 +153,11 @@ class GossipVisualization:
         
         # 传播扇出
         ttk.Label(params_frame, text="传播扇出:").pack(anchor=tk.W, pady=(10, 0))
-        self.fanout_var = tk.IntVar(value=3)
+        self.fanout_var = tk.IntVar(value=self.simulator.gossip_fanout)
         fanout_scale = ttk.Scale(params_frame, from_=1, to=10, variable=self.fanout_var,
                                 orient=tk.HORIZONTAL, command=self._update_fanout)
         fanout_scale.pack(fill=tk.X, pady=2)
-        self.fanout_label = ttk.Label(params_frame, text="3")
+        self.fanout_label = ttk.Label(params_frame, text=str(self.simulator.gossip_fanout))
         self.fanout_label.pack(anchor=tk.W)
         
         # 传输成功率
@@ -160,75 +200,169 @@ class GossipVisualization:
         """绘制初始网络"""
         self.canvas.delete("all")
         
-        # 绘制连接线
-        for node_id, node in self.simulator.nodes.items():
-            for neighbor_id in node.neighbors:
-                if neighbor_id > node_id:  # 避免重复绘制
-                    neighbor = self.simulator.nodes[neighbor_id]
-                    self.canvas.create_line(
-                        node.x, node.y, neighbor.x, neighbor.y,
-                        fill="#E0E0E0", width=1, tags="edge"
-                    )
+        xs = self.simulator.xs.tolist()
+        ys = self.simulator.ys.tolist()
         
+        # 绘制连接线
+        for i, j in self.simulator.edges.tolist():
+            self.canvas.create_line(
+                xs[i], ys[i], xs[j], ys[j],
+                fill="#E0E0E0", width=1, tags="edge"
+            )
+            
         # 绘制节点
-        for node_id, node in self.simulator.nodes.items():
-            color = self.colors[node.state]
-            self.canvas.create_oval(
-                node.x - self.node_radius, node.y - self.node_radius,
-                node.x + self.node_radius, node.y + self.node_radius,
-                fill=color, outline="black", width=1,
+        colors = self._colors_arr[self.simulator.states].tolist()
+        self._node_items = []
+        for node_id in range(self.simulator.num_nodes):
+            x, y = xs[node_id], ys[node_id]
+            item = self.canvas.create_oval(
+                x - self.node_radius, y - self.node_radius,
+                x + self.node_radius, y + self.node_radius,
+                fill=colors[node_id], outline="black", width=1,
                 tags=f"node_{node_id}"
             )
+            self._node_items.append(item)
             
-            # 节点标签
-            self.canvas.create_text(
-                node.x, node.y, text=str(node_id),
-                font=("Arial", 8), tags=f"label_{node_id}"
-            )
+        self._draw_labels(xs, ys)
+        self._prev_states = self.simulator.states.copy()
+        
+    def _draw_labels(self, xs: List[float], ys: List[float]):
+        """绘制节点标签
+        
+        节点较多时标签互相重叠，不再绘制。安装了Pillow时把全部标签渲染到一张透明图片上，
+        画布中只增加一个图片item；否则为每个节点创建一个文本item。
+        """
+        self._label_image = None
+        if self.simulator.num_nodes > self.max_labeled_nodes:
+            return
             
+        if Image is None:
+            for node_id in range(self.simulator.num_nodes):
+                self.canvas.create_text(
+                    xs[node_id], ys[node_id], text=str(node_id),
+                    font=("Arial", 8), tags="label"
+                )
+            return
+            
+        image = Image.new("RGBA", (self.simulator.width, self.simulator.height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default()
+        for node_id in range(self.simulator.num_nodes):
+            text = str(node_id)
+            left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+            draw.text((xs[node_id] - (left + right) / 2, ys[node_id] - (top + bottom) / 2),
+                      text, fill="black", font=font)
+        self._label_image = ImageTk.PhotoImage(image)
+        self.canvas.create_image(0, 0, anchor=tk.NW, image=self._label_image, tags="label")
+        
     def _update_visualization(self):
         """更新可视化"""
-        # 更新节点颜色
-        for node_id, node in self.simulator.nodes.items():
-            color = self.colors[node.state]
-            self.canvas.itemconfig(f"node_{node_id}", fill=color)
-            
-        # 更新统计信息
-        stats = self.simulator.get_statistics()
-        self.step_label.config(text=f"步数: {stats['step']}")
-        self.susceptible_label.config(text=f"易感染: {stats['susceptible']}")
-        self.infected_label.config(text=f"已感染: {stats['infected']}")
-        self.removed_label.config(text=f"已移除: {stats['removed']}")
-        self.messages_label.config(text=f"消息总数: {stats['total_messages']}")
+        # 读取模拟线程最近发布的快照
+        front = self._front
+        states = self._state_buffers[front]
+        stats = self._stats_buffers[front]
+        
+        # 只更新状态发生变化的节点颜色
+        changed = np.flatnonzero(states != self._prev_states)
+        colors = self._colors_arr[states[changed]].tolist()
+        for node_id, color in zip(changed.tolist(), colors):
+            self.canvas.itemconfig(self._node_items[node_id], fill=color)
+        self._prev_states[changed] = states[changed]
+        
+        # 更新统计信息（文本未变的标签不再重设）
+        self._set_label_text(self.step_label, f"步数: {stats['step']}")
+        self._set_label_text(self.susceptible_label, f"易感染: {stats['susceptible']}")
+        self._set_label_text(self.infected_label, f"已感染: {stats['infected']}")
+        self._set_label_text(self.removed_label, f"已移除: {stats['removed']}")
+        self._set_label_text(self.messages_label, f"消息总数: {stats['total_messages']}")
+        
+    def _set_label_text(self, label: ttk.Label, text: str):
+        """设置标签文本，与当前显示相同时跳过"""
+        if self._label_texts.get(label) != text:
+            label.config(text=text)
+            self._label_texts[label] = text
         
     def start_simulation(self):
         """开始模拟"""
-        self.simulator.start_gossip([0])  # 从节点0开始
-        self.is_running = True
-        self._animate()
-        
+        self._flush_pending_rebuild()
+        with self._sim_lock:
+            self.simulator.start_gossip([0])  # 从节点0开始
+            self._publish_state()
+        self._sim_active.set()
+        if not self.is_running:
+            self.is_running = True
+            self._animate()
+            
     def toggle_simulation(self):
         """暂停/继续模拟"""
         self.is_running = not self.is_running
         if self.is_running:
+            if self.simulator.running:
+                self._sim_active.set()
             self._animate()
+        else:
+            self._sim_active.clear()
             
     def step_simulation(self):
         """单步执行"""
-        self.simulator.step()
+        if self.is_running or self._step_future is not None:
+            return
+        self._flush_pending_rebuild()
+        self._step_future = self._step_executor.submit(self._step_once)
+        self._poll_step()
+        
+    def _step_once(self):
+        """在工作线程中推进一步并发布快照"""
+        with self._sim_lock:
+            self.simulator.step()
+            self._publish_state()
+            
+    def _poll_step(self):
+        """等待单步执行完成后刷新界面"""
+        if not self._step_future.done():
+            self.root.after(10, self._poll_step)
+            return
+        future, self._step_future = self._step_future, None
+        future.result()  # 把工作线程中的异常抛到界面线程
         self._update_visualization()
         
     def reset_simulation(self):
         """重置模拟"""
         self.is_running = False
-        self.simulator.reset_simulation()
+        self._sim_active.clear()
+        self._flush_pending_rebuild()
+        with self._sim_lock:
+            self.simulator.reset_simulation()
+            self._publish_state()
         self._update_visualization()
         
+    def _run_sim(self):
+        """模拟线程主循环：推进一步、发布快照，再按动画速度等待"""
+        while True:
+            self._sim_active.wait()
+            with self._sim_lock:
+                self.simulator.step()
+                if not self.simulator.running:
+                    self._sim_active.clear()
+                self._publish_state()
+            time.sleep(self.animation_speed / 1000)
+            
+    def _publish_state(self):
+        """把模拟器当前状态写入后台缓冲区并切换为前台（调用方需持有_sim_lock）"""
+        back = 1 - self._front
+        if self._state_buffers[back].shape != self.simulator.states.shape:
+            self._state_buffers[back] = self.simulator.states.copy()
+        else:
+            np.copyto(self._state_buffers[back], self.simulator.states)
+        self._stats_buffers[back] = self.simulator.get_statistics()
+        self._front = back
+        
     def _animate(self):
-        """动画循环"""
-        if self.is_running and self.simulator.running:
-            self.simulator.step()
-            self._update_visualization()
+        """动画循环：按动画速度重绘模拟线程发布的最新快照"""
+        if not self.is_running:
+            return
+        self._update_visualization()
+        if self._stats_buffers[self._front]['running'] or self._sim_active.is_set():
             self.root.after(self.animation_speed, self._animate)
         else:
             self.is_running = False
@@ -239,9 +373,33 @@ class GossipVisualization:
         count = int(float(value))
         self.nodes_label.config(text=str(count))
         if not self.is_running:
-            self.simulator = GossipSimulator(num_nodes=count, width=800, height=600)
-            self._draw_initial_network()
+            # 拖动过程中每个刻度都会触发，只保留最后一次重建
+            if self._pending_rebuild is not None:
+                self.root.after_cancel(self._pending_rebuild)
+            self._pending_rebuild = self.root.after(200, self._do_rebuild)
             
+    def _flush_pending_rebuild(self):
+        """节点数量刚调整过时，立即完成尚未执行的重建"""
+        if self._pending_rebuild is not None:
+            self.root.after_cancel(self._pending_rebuild)
+            self._do_rebuild()
+            
+    def _do_rebuild(self):
+        """按滑块当前的节点数量重建模拟器并重绘网络"""
+        self._pending_rebuild = None
+        if self.is_running:
+            return
+            
+        count = int(float(self.nodes_var.get()))
+        fanout = self.fanout_var.get() if self._fanout_overridden else None
+        with self._sim_lock:
+            self.simulator = GossipSimulator(num_nodes=count, width=800, height=600,
+                                             gossip_fanout=fanout)
+            self._publish_state()
+        self.fanout_var.set(self.simulator.gossip_fanout)
+        self.fanout_label.config(text=str(self.simulator.gossip_fanout))
+        self._draw_initial_network()
+        
     def _update_infection_prob(self, value):
         """更新感染概率"""
         prob = float(value)
@@ -258,6 +416,7 @@ class GossipVisualization:
         """更新传播扇出"""
         fanout = int(float(value))
         self.fanout_label.config(text=str(fanout))
+        self._fanout_overridden = True
         self.simulator.update_parameters(gossip_fanout=fanout)
         
     def _update_transmission_prob(self, value):